@@ -0,0 +1,59 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+
+import publish  # noqa: E402
+
+
+class CborRoundTripTest(unittest.TestCase):
+    def assertRoundTrips(self, value):
+        self.assertEqual(publish.cbor_loads(publish.cbor_dumps(value)), value)
+
+    def test_scalars(self):
+        for value in [None, True, False, 0, -1, 1.5, -0.25, "", "ä € 𝄞"]:
+            with self.subTest(value=value):
+                self.assertRoundTrips(value)
+
+    def test_integer_widths(self):
+        for bits in [0, 5, 8, 16, 32, 64]:
+            for value in [(1 << bits) - 1, 1 << bits, -(1 << bits)]:
+                if value >= 1 << 64 or value < -(1 << 64):
+                    continue
+                with self.subTest(value=value):
+                    self.assertRoundTrips(value)
+
+    def test_booleans_stay_booleans(self):
+        decoded = publish.cbor_loads(publish.cbor_dumps([True, 1, False, 0]))
+        self.assertEqual([type(v) for v in decoded], [bool, int, bool, int])
+
+    def test_nested(self):
+        self.assertRoundTrips({"a": [1, {"b": [None, "c"]}], "d": {}, "e": []})
+
+    def test_manifest(self):
+        manifest = json.loads(publish.MANIFEST_PATH.read_text(encoding="utf-8"))
+        self.assertRoundTrips(manifest)
+
+    def test_known_encoding(self):
+        # RFC 8949 appendix A examples.
+        self.assertEqual(publish.cbor_dumps(1000), bytes.fromhex("1903e8"))
+        self.assertEqual(publish.cbor_dumps(-100), bytes.fromhex("3863"))
+        self.assertEqual(publish.cbor_dumps("IETF"), bytes.fromhex("6449455446"))
+        self.assertEqual(
+            publish.cbor_dumps({"a": 1, "b": [2, 3]}),
+            bytes.fromhex("a26161016162820203"),
+        )
+
+    def test_rejects_trailing_data(self):
+        with self.assertRaises(ValueError):
+            publish.cbor_loads(publish.cbor_dumps(1) + b"\x00")
+
+    def test_rejects_oversized_integer(self):
+        with self.assertRaises(ValueError):
+            publish.cbor_dumps(1 << 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
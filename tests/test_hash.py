@@ -0,0 +1,69 @@
+import contextlib
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+
+import publish  # noqa: E402
+
+URL = "https://cdn.example/pkg.zip"
+ITEM = {"id": "x", "download_fs20": URL}
+
+
+class HashDownloadsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(
+            publish, "DIGEST_CACHE_PATH", Path(tmp.name) / "digests.json"
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.hashed = []
+
+    def run_hash(self, link: dict, digest):
+        def hash_download(url, throttle):
+            self.hashed.append(url)
+            if digest is None:
+                raise OSError("connection closed")
+            return digest
+
+        with (
+            mock.patch.object(publish, "refresh_links", return_value=({URL: link}, 0)),
+            mock.patch.object(publish, "hash_download", hash_download),
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            return publish.hash_downloads([ITEM], 0)[0]
+
+    def test_reuses_digest_while_version_is_unchanged(self):
+        link = {"ok": True, "etag": '"v1"'}
+        self.assertEqual(self.run_hash(link, "OLD")["sha256_fs20"], "OLD")
+        self.assertEqual(self.run_hash(link, None)["sha256_fs20"], "OLD")
+        self.assertEqual(len(self.hashed), 1)
+
+    def test_rehashes_changed_archive(self):
+        self.run_hash({"ok": True, "etag": '"v1"'}, "OLD")
+        item = self.run_hash({"ok": True, "etag": '"v2"'}, "NEW")
+        self.assertEqual(item["sha256_fs20"], "NEW")
+
+    def test_failed_rehash_drops_stale_digest(self):
+        self.run_hash({"ok": True, "etag": '"v1"'}, "OLD")
+        item = self.run_hash({"ok": True, "etag": '"v2"'}, None)
+        self.assertNotIn("sha256_fs20", item)
+
+        # The failure isn't cached; the next run tries again.
+        item = self.run_hash({"ok": True, "etag": '"v2"'}, "NEW")
+        self.assertEqual(item["sha256_fs20"], "NEW")
+
+    def test_unreachable_download_has_no_digest(self):
+        self.run_hash({"ok": True, "etag": '"v1"'}, "OLD")
+        item = self.run_hash({"ok": False, "status": 503}, "OLD")
+        self.assertNotIn("sha256_fs20", item)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+
+import publish  # noqa: E402
+
+REJECTED = [
+    b"\xef\xbb\xbf{}",
+    b'"\\ud800"',
+    b'"\\ude00\\ud83d"',
+    b'{"\\udc00": 1}',
+    b'"\xff"',
+    b'"\xed\xa0\x80"',
+    b"NaN",
+    b"[-Infinity]",
+    b"1e400",
+    b"1" + b"0" * 400,
+]
+
+ACCEPTED = {
+    b'"\\ud83d\\ude00"': "\U0001f600",
+    b'"\\\\ud800"': "\\ud800",
+    b"18446744073709551615": 18446744073709551615,
+    b"18446744073709551616": 18446744073709551616.0,
+    b"-9223372036854775809": -9223372036854775809.0,
+    b"1e-400": 0.0,
+    b' {"a": [1, 2.5, null]} ': {"a": [1, 2.5, None]},
+}
+
+
+class StdlibBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.installed = publish.orjson
+        publish.orjson = None
+
+    def tearDown(self):
+        publish.orjson = self.installed
+
+    def test_rejects_what_orjson_rejects(self):
+        for data in REJECTED:
+            with self.subTest(data=data[:20]):
+                with self.assertRaises(ValueError):
+                    publish.json_loads(data)
+
+    def test_accepts_what_orjson_accepts(self):
+        for data, expected in ACCEPTED.items():
+            with self.subTest(data=data[:20]):
+                self.assertEqual(publish.json_loads(data), expected)
+
+
+@unittest.skipIf(publish.orjson is None, "orjson is not installed")
+class OrjsonBackendTest(unittest.TestCase):
+    def test_same_results(self):
+        for data in REJECTED:
+            with self.subTest(data=data[:20]):
+                with self.assertRaises(ValueError):
+                    publish.json_loads(data)
+        for data, expected in ACCEPTED.items():
+            with self.subTest(data=data[:20]):
+                self.assertEqual(publish.json_loads(data), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+
+import publish  # noqa: E402
+
+
+# Local stand-in for a download host, one behaviour per path.
+class StandIn(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond()
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        if self.path == "/ok":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.reply(304)
+            else:
+                self.reply(200, ETag='"v1"', **{"Content-Length": "10"})
+        elif self.path == "/no-head":
+            if self.command == "HEAD":
+                self.reply(405)
+            else:
+                range_ = {"Content-Range": "bytes 0-0/1234", "Content-Length": "1"}
+                self.reply(206, body=b"x", **range_)
+        elif self.path == "/flaky":
+            self.server.flaky += 1
+            self.reply(503 if self.server.flaky <= 2 else 200)
+        else:
+            self.reply(404)
+
+    def reply(self, status, body=b"", **headers):
+        self.send_response(status)
+        headers.setdefault("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command == "GET":
+            self.wfile.write(body)
+
+
+class ProbeLinkTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        self.server.requests = []
+        self.server.flaky = 0
+        serve = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+        serve.daemon = True
+        serve.start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+        patcher = mock.patch.object(publish.time, "sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_head(self):
+        result = publish.probe_link(self.base + "/ok")
+        self.assertTrue(result["ok"])
+        self.assertEqual((result["size"], result["etag"]), (10, '"v1"'))
+        self.assertEqual([r[0] for r in self.server.requests], ["HEAD"])
+
+    def test_ranged_get_fallback(self):
+        result = publish.probe_link(self.base + "/no-head")
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["size"], 1234)
+        self.assertEqual([r[0] for r in self.server.requests], ["HEAD", "GET"])
+        self.assertEqual(self.server.requests[1][2]["Range"], "bytes=0-0")
+
+    def test_not_modified_renews_cached_result(self):
+        cached = {"ok": True, "status": 200, "etag": '"v1"', "checked_at": 0}
+        result = publish.probe_link(self.base + "/ok", cached)
+        self.assertEqual(result["etag"], '"v1"')
+        self.assertGreater(result["checked_at"], 0)
+        self.assertEqual(self.server.requests[0][2]["If-None-Match"], '"v1"')
+
+    def test_server_errors_are_retried(self):
+        result = publish.probe_link(self.base + "/flaky")
+        self.assertTrue(result["ok"])
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        result = publish.probe_link(self.base + "/missing")
+        self.assertEqual((result["ok"], result["status"]), (False, 404))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_connection_error(self):
+        self.server.server_close()
+        with mock.patch.object(publish, "LINK_RETRIES", 0):
+            result = publish.probe_link(self.base + "/ok")
+        self.assertFalse(result["ok"])
+        self.assertIn("error", result)
+
+    def test_refresh_reuses_fresh_results(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with mock.patch.object(publish, "LINK_CACHE_PATH", Path(tmp) / "c.json"):
+                urls = [self.base + "/ok", self.base + "/missing"]
+                results, probed = publish.refresh_links(urls)
+                self.assertEqual(probed, 2)
+                self.assertTrue(results[urls[0]]["ok"])
+
+                # Unhealthy results are re-probed; healthy ones are reused.
+                results, probed = publish.refresh_links(urls)
+                self.assertEqual(probed, 1)
+                self.assertEqual(len(self.server.requests), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import contextlib
+import io
+import sys
+import tempfile
+import threading
+import unittest
+import zipfile
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools"))
+
+import publish  # noqa: E402
+
+
+def fixture_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("Foo-Livery/layout.json", "{}")
+        archive.writestr("Foo-Livery/texture/a.dds", b"\0" * 5000)
+        archive.writestr("Extra/readme.txt", "hi")
+        archive.writestr("top-level.txt", "not a folder")
+    return buffer.getvalue()
+
+
+class Quiet(publish.ManifestRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_document(self, head: bool):
+        self.server.requests.append((self.command, self.headers.get("Range")))
+        super().send_document(head)
+
+
+# Serves fixed bodies through the --serve handler, which supports Range.
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, files: dict):
+        super().__init__(("127.0.0.1", 0), Quiet)
+        self.files = files
+        self.requests = []
+
+    def document(self, path: str):
+        if path not in self.files:
+            return None
+        return publish.Document(self.files[path], "application/zip")
+
+
+class ParseRangeTest(unittest.TestCase):
+    def test_ranges(self):
+        cases = {
+            "bytes=0-0": (0, 0),
+            "bytes=5-": (5, 99),
+            "bytes=-10": (90, 99),
+            "bytes=90-200": (90, 99),
+            "bytes=-0": (),
+            "bytes=100-": (),
+            "bytes=0-1,5-6": None,
+            "items=0-1": None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(publish.parse_range(header, 100), expected)
+
+    def test_malformed(self):
+        with self.assertRaises(ValueError):
+            publish.parse_range("bytes=a-b", 100)
+
+
+class PackageTest(unittest.TestCase):
+    def setUp(self):
+        self.data = fixture_zip()
+        self.server = FixtureServer({"/pkg.zip": self.data})
+        serve = threading.Thread(target=self.server.serve_forever, args=(0.01,))
+        serve.daemon = True
+        serve.start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/pkg.zip"
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in {
+            "LINK_CACHE_PATH": Path(tmp.name) / "links.json",
+            "ZIP_CACHE_PATH": Path(tmp.name) / "zips.json",
+            # Smaller than the central directory, so reads go past the tail.
+            "ZIP_TAIL": 64,
+        }.items():
+            patcher = mock.patch.object(publish, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def verify(self, items):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            publish.verify_packages(items)
+        return output.getvalue().splitlines()
+
+    def test_remote_file_reads_ranges(self):
+        remote = publish.RemoteFile(self.url)
+        self.assertEqual(remote.size, len(self.data))
+        self.assertEqual(remote.read(), self.data)
+        remote.seek(-10, io.SEEK_END)
+        self.assertEqual(remote.read(4), self.data[-10:-6])
+        self.assertTrue(all(r[1] for r in self.server.requests))
+
+    def test_zip_top_folders(self):
+        self.assertEqual(publish.zip_top_folders(self.url), ["Extra", "Foo-Livery"])
+
+    def test_folder_diff_and_cache_reuse(self):
+        item = {
+            "id": "x",
+            "download_fs20": self.url,
+            # Folder names are compared case-insensitively.
+            "package_folders_fs20": ["foo-livery", "Missing"],
+        }
+        lines = self.verify([item])
+        self.assertEqual(
+            lines,
+            [
+                "Package check: x fs20: 'Missing' not in archive",
+                "Package check: x fs20: 'Extra' not declared",
+                "Verified 1 package(s), 1 archive(s) read; 2 problem(s).",
+            ],
+        )
+
+        requests = len(self.server.requests)
+        lines = self.verify([item])
+        self.assertEqual(
+            lines[-1], "Verified 1 package(s), 0 archive(s) read; 2 problem(s)."
+        )
+        self.assertEqual(len(self.server.requests), requests)
+
+    def test_server_without_range_support(self):
+        with mock.patch.object(publish, "parse_range", return_value=None):
+            lines = self.verify([{"id": "x", "download_fs20": self.url}])
+        self.assertIn("does not support Range requests", lines[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Micro-benchmarks for the codecs and the meta validator in publish.py, run on synthetic
+# catalogs built by repeating the liveries in liveries/ under fresh ids.
+#   python tools/bench_manifest.py [--items 1000 10000 100000]
+
+import argparse
+import json
+import time
+
+import publish
+
+
+def synthetic_items(count: int):
+    metas = [
+        publish.json_loads(path.read_bytes())
+        for path in sorted(publish.LIVERIES_DIR.glob("*.meta.json"))
+    ]
+    return [
+        {**metas[n % len(metas)], "id": f"{metas[n % len(metas)]['id']}-{n}"}
+        for n in range(count)
+    ]
+
+
+def best_of(func, *args, repeat: int = 5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_backends(items: list, repeat: int):
+    metas = [json.dumps(item, indent=2).encode("utf-8") for item in items]
+    manifest = json.dumps({"items": items}, indent=2).encode("utf-8")
+
+    installed = publish.orjson
+    backends = {"stdlib": None}
+    if installed:
+        backends["orjson"] = installed
+    try:
+        for name, backend in backends.items():
+            publish.orjson = backend
+            meta_time = best_of(
+                lambda: list(map(publish.json_loads, metas)), repeat=repeat
+            )
+            manifest_time = best_of(publish.json_loads, manifest, repeat=repeat)
+            print(
+                f"  decode {name:<7} meta files {meta_time * 1000:9.1f} ms"
+                f"   manifest {manifest_time * 1000:9.1f} ms"
+            )
+    finally:
+        publish.orjson = installed
+
+    encode_time = best_of(
+        lambda: json.dumps({"items": items}, indent=2), repeat=repeat
+    )
+    print(f"  encode stdlib  manifest   {encode_time * 1000:9.1f} ms")
+
+
+# The checks validate_meta() made before the schema: six required fields and
+# one of the two downloads, with no type, URL or nested checks.
+def legacy_checks(meta: dict):
+    required = ["id", "title_line", "developer", "aircraft", "author", "version"]
+    errors = [field for field in required if not meta.get(field)]
+    if not meta.get("download_fs20") and not meta.get("download_fs24"):
+        errors.append("downloads")
+    return errors
+
+
+def bench_validate(items: list, repeat: int):
+    metas = [json.dumps(item, indent=2).encode("utf-8") for item in items]
+    decode = f"decode ({'orjson' if publish.orjson else 'stdlib'})"
+    runs = {
+        decode: lambda: list(map(publish.json_loads, metas)),
+        "validate_meta": lambda: [publish.validate_meta(m, "x") for m in items],
+        "legacy checks": lambda: list(map(legacy_checks, items)),
+    }
+    timings = {name: best_of(run, repeat=repeat) for name, run in runs.items()}
+    for name, seconds in timings.items():
+        print(
+            f"  {name:<16}  {seconds * 1000:10.1f} ms"
+            f"   {seconds / len(items) * 1e6:6.2f} us/file"
+            f"   {seconds / timings[decode]:5.2f}x decode"
+        )
+
+
+def bench_cbor(items: list, repeat: int):
+    manifest = {"items": items}
+    encoded = {
+        "json": json.dumps(manifest, indent=2).encode("utf-8"),
+        "json-min": json.dumps(manifest, separators=(",", ":")).encode("utf-8"),
+        "cbor": publish.cbor_dumps(manifest),
+    }
+    for name, data in encoded.items():
+        decode = publish.cbor_loads if name == "cbor" else publish.json_loads
+        decode_time = best_of(decode, data, repeat=repeat)
+        print(
+            f"  {name:<8}  {len(data) / 1024:10.1f} KiB"
+            f"   decode {decode_time * 1000:9.1f} ms"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--items",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="catalog sizes to benchmark",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="best of N runs")
+    args = parser.parse_args(argv)
+
+    if publish.orjson is None:
+        print("orjson is not installed; only the stdlib backend is measured.")
+
+    for count in args.items:
+        print(f"{count} item(s):")
+        items = synthetic_items(count)
+        bench_backends(items, args.repeat)
+        bench_validate(items, args.repeat)
+        bench_cbor(items, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
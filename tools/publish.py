@@ -6,77 +6,2241 @@
 #   - package_folders_fs20 / package_folders_fs24
 # Outputs manifest.json consumed by the app
 
+import argparse
+import asyncio
+import base64
+import gzip
+import hashlib
+import http.client
+import io
 import json
+import math
+import mimetypes
+import os
+import re
+import struct
+import subprocess
 import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = flags = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 LIVERIES_DIR = REPO_ROOT / "liveries"
 MANIFEST_PATH = REPO_ROOT / "manifest.json"
+CACHE_PATH = REPO_ROOT / ".publish-cache.json"
+DELTAS_DIR = REPO_ROOT / "deltas"
+DELTA_HISTORY = 20
+SHARDS_DIR = REPO_ROOT / "shards"
+SUMMARY_PATH = REPO_ROOT / "summary.json"
+ITEMS_DIR = REPO_ROOT / "items"
+SUMMARY_FIELDS = ["id", "title_line", "aircraft", "version", "featured"]
+OBJECTS_DIR = REPO_ROOT / "objects"
+POINTERS_PATH = REPO_ROOT / "pointers.json"
+CBOR_PATH = REPO_ROOT / "manifest.cbor"
+COLUMNS_PATH = REPO_ROOT / "manifest.columns.json"
+URL_ORIGIN = re.compile(r"[a-z][a-z0-9+.-]*://[^/?#]*", re.IGNORECASE)
+WATCH_DEBOUNCE = 0.2
+WATCH_QUIET_MS = 20
+LINK_CACHE_PATH = REPO_ROOT / ".link-cache.json"
+LINK_TTL = 24 * 60 * 60
+LINK_MAX_AGE = 30 * 24 * 60 * 60
+LINK_TIMEOUT = 10
+LINK_RETRIES = 2
+LINKS_PER_HOST = 4
+USER_AGENT = "jsworks-publish"
+SIMS = ["fs20", "fs24"]
+ZIP_CACHE_PATH = REPO_ROOT / ".zip-cache.json"
+ZIP_TAIL = 64 * 1024 + 22
+DIGEST_CACHE_PATH = REPO_ROOT / ".digest-cache.json"
+HASH_CONCURRENCY = 3
+HASH_CHUNK = 1024 * 1024
+PHOTO_CACHE_DIR = REPO_ROOT / ".photo-cache"
+THUMBS_DIR = REPO_ROOT / "thumbs"
+PHOTO_SIZES = {"thumb": 320, "medium": 1280}
+PLACEHOLDERS_PATH = PHOTO_CACHE_DIR / "placeholders.json"
+PLACEHOLDER_SIZE = 16
+ATLAS_MAP_PATH = REPO_ROOT / "atlas.json"
+ATLAS_CELL = (320, 180)
+ATLAS_COLUMNS = 4
+# Fields the publish stages add to items; they never come from meta files.
+DERIVED_FIELDS = {
+    f"{key}_{sim}" for key in ["size", "modified", "sha256"] for sim in SIMS
+} | {"photo_variants", "placeholder"}
+
+
+# Decoding goes through orjson when it is installed. Encoding always uses the
+# stdlib so manifest.json stays byte-identical whichever backend is present.
+# The stdlib path is restricted to what orjson accepts (strict UTF-8 without
+# a BOM, no unpaired surrogate escapes, no NaN or Infinity, integers outside
+# 64 bits become floats), so a meta file validates the same way under either
+# backend.
+SURROGATE_ESCAPE = re.compile(r"\\u[dD][89a-fA-F]")
+
+
+def _json_constant(name: str):
+    raise ValueError(f"{name} is not valid JSON")
+
+
+def _json_float(text: str):
+    value = float(text)
+    if math.isinf(value):
+        raise ValueError(f"number {text[:20]} is out of range")
+    return value
+
+
+def _json_int(text: str):
+    value = int(text)
+    if -(1 << 63) <= value < 1 << 64:
+        return value
+    return _json_float(text)
+
+
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+
+    text = data.decode("utf-8") if isinstance(data, bytes) else data
+    if text.startswith("\ufeff"):
+        raise ValueError("byte order mark (BOM) is not supported")
+    value = json.loads(
+        text,
+        parse_constant=_json_constant,
+        parse_float=_json_float,
+        parse_int=_json_int,
+    )
+    if SURROGATE_ESCAPE.search(text):
+        # Raises UnicodeEncodeError (a ValueError) on an unpaired surrogate.
+        json.dumps(value, ensure_ascii=False).encode("utf-8")
+    return value
+
+
+# Declarative schema for the legacy meta format, compiled once into nested
+# check functions. Every error is reported with its JSON path.
+TEXT = {"type": "string", "min_length": 1}
+URL = {"type": "string", "format": "url", "min_length": 1}
+PACKAGE_FOLDERS = {"type": "array", "items": TEXT}
+
+META_SCHEMA = {
+    "type": "object",
+    "required": ["id", "title_line", "developer", "aircraft", "author", "version"],
+    "require_any": [["download_fs20", "download_fs24"]],
+    "properties": {
+        "id": TEXT,
+        "title_line": TEXT,
+        "developer": TEXT,
+        "aircraft": TEXT,
+        "author": TEXT,
+        "version": TEXT,
+        "released": {"type": "string"},
+        "status": {"type": "string"},
+        "featured": {"type": "boolean"},
+        "available": {"type": "boolean"},
+        "changelog": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["version"],
+                "properties": {
+                    "version": TEXT,
+                    "date": {"type": "string"},
+                    "changes": {"type": "array", "items": {"type": "string"}},
+                },
+            },
+        },
+        "photos": {"type": "array", "items": URL},
+        # Empty when the livery isn't available for that simulator.
+        "download_fs20": {"type": "string", "format": "url"},
+        "download_fs24": {"type": "string", "format": "url"},
+        "package_folders_fs20": PACKAGE_FOLDERS,
+        "package_folders_fs24": PACKAGE_FOLDERS,
+    },
+}
+
+SCHEMA_TYPES = {"string": str, "boolean": bool, "array": list, "object": dict}
+SCHEMA_FORMATS = {"url": re.compile(r"https?://[^\s/?#]+\S*")}
+
+
+def compile_schema(schema: dict):
+    expected = SCHEMA_TYPES[schema["type"]]
+    checks = []
+
+    # Leaves are most of the calls, so each gets one fused function.
+    if expected is str:
+        return compile_string(schema)
+    if expected is bool:
+        return compile_leaf(schema)
+
+    if "min_length" in schema:
+        min_length = schema["min_length"]
+
+        def check_length(value, path, errors):
+            if len(value) < min_length:
+                errors.append(f"{path}: must not be empty")
+
+        checks.append(check_length)
+
+    if "format" in schema:
+        name = schema["format"]
+        pattern = SCHEMA_FORMATS[name]
+
+        def check_format(value, path, errors):
+            if value and not pattern.fullmatch(value):
+                errors.append(f"{path}: expected {name}, got {value!r}")
+
+        checks.append(check_format)
+
+    if "items" in schema:
+        check_item = compile_schema(schema["items"])
+
+        def check_items(value, path, errors):
+            for index, item in enumerate(value):
+                check_item(item, f"{path}[{index}]", errors)
+
+        checks.append(check_items)
+
+    if "required" in schema:
+        required = schema["required"]
+
+        def check_required(value, path, errors):
+            for field in required:
+                if field not in value:
+                    errors.append(f"{path}.{field}: missing required field")
+
+        checks.append(check_required)
+
+    if "require_any" in schema:
+        groups = schema["require_any"]
+
+        def check_require_any(value, path, errors):
+            for group in groups:
+                if not any(value.get(field) for field in group):
+                    errors.append(f"{path}: requires one of {' / '.join(group)}")
+
+        checks.append(check_require_any)
+
+    if "properties" in schema:
+        properties = {
+            field: compile_schema(subschema)
+            for field, subschema in schema["properties"].items()
+        }
+
+        def check_properties(value, path, errors):
+            for field, check_field in properties.items():
+                if field in value:
+                    check_field(value[field], f"{path}.{field}", errors)
+
+        checks.append(check_properties)
+
+    def check(value, path, errors):
+        if not isinstance(value, expected):
+            errors.append(f"{path}: expected {schema['type']}")
+            return
+        for check_part in checks:
+            check_part(value, path, errors)
+
+    return check
+
+
+def compile_string(schema: dict):
+    min_length = schema.get("min_length", 0)
+    name = schema.get("format")
+    pattern = SCHEMA_FORMATS[name] if name else None
+
+    def check_string(value, path, errors):
+        if not isinstance(value, str):
+            errors.append(f"{path}: expected string")
+            return
+        if len(value) < min_length:
+            errors.append(f"{path}: must not be empty")
+        if pattern and value and not pattern.fullmatch(value):
+            errors.append(f"{path}: expected {name}, got {value!r}")
+
+    return check_string
+
+
+def compile_leaf(schema: dict):
+    expected = SCHEMA_TYPES[schema["type"]]
+
+    def check_leaf(value, path, errors):
+        if not isinstance(value, expected):
+            errors.append(f"{path}: expected {schema['type']}")
+
+    return check_leaf
+
+
+check_meta = compile_schema(META_SCHEMA)
 
 
 def validate_meta(meta: dict, fname: str):
     errors = []
+    check_meta(meta, "$", errors)
+    return [f"{fname}: {error}" for error in errors]
+
+
+def parse_meta(data: bytes, fname: str):
+    try:
+        meta = json_loads(data)
+    except Exception as e:
+        return None, [f"{fname}: invalid JSON ({e})"]
+
+    if not isinstance(meta, dict):
+        return None, [f"{fname}: root JSON value must be an object"]
 
-    for field in ["id", "title_line", "developer", "aircraft", "author", "version"]:
-        if not meta.get(field):
-            errors.append(f"{fname}: missing required field: {field}")
+    errors = validate_meta(meta, fname)
+    if errors:
+        return None, errors
 
-    if not meta.get("download_fs20") and not meta.get("download_fs24"):
-        errors.append(
-            f"{fname}: missing downloads (download_fs20 / download_fs24 required)"
+    return meta, []
+
+
+# Build cache: meta file name -> size, mtime, sha256 and the validated item.
+# Entries are only trusted while this script is unchanged, so edits to the
+# validation rules force a full re-check.
+def tool_digest():
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def load_cache():
+    try:
+        cache = json_loads(CACHE_PATH.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get("tool") != tool_digest():
+        return {}
+
+    return cache.get("files", {})
+
+
+def save_cache(files: dict):
+    cache = {"tool": tool_digest(), "files": files}
+    CACHE_PATH.write_text(json.dumps(cache), encoding="utf-8")
+
+
+def read_meta(meta_file: Path, known_sha256=None):
+    try:
+        stat = meta_file.stat()
+        data = meta_file.read_bytes()
+    except OSError as e:
+        return None, [f"{meta_file.name}: invalid JSON ({e})"]
+
+    entry = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "item": None,
+    }
+
+    # Touched but unchanged: the caller keeps its cached item.
+    if entry["sha256"] == known_sha256:
+        return entry, []
+
+    entry["item"], errors = parse_meta(data, meta_file.name)
+    return entry, errors
+
+
+def _read_meta_args(args):
+    return read_meta(*args)
+
+
+def ingest(meta_files: list, cache: dict, jobs: int = 1):
+    results = {}
+    stale = []
+
+    for meta_file in meta_files:
+        try:
+            stat = meta_file.stat()
+        except OSError:
+            # Gone or unreadable; read_meta() reports it as this file's error.
+            stale.append((meta_file, None))
+            continue
+
+        entry = cache.get(meta_file.name)
+        if (
+            entry
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            results[meta_file.name] = (entry["item"], [])
+        else:
+            known = entry["sha256"] if entry else None
+            stale.append((meta_file, known))
+
+    if jobs > 1 and len(stale) > 1:
+        chunksize = max(1, len(stale) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            read = list(pool.map(_read_meta_args, stale, chunksize=chunksize))
+    else:
+        read = [read_meta(*args) for args in stale]
+
+    for (meta_file, _), (entry, errors) in zip(stale, read):
+        if errors:
+            cache.pop(meta_file.name, None)
+            results[meta_file.name] = (None, errors)
+            continue
+
+        if entry["item"] is None:
+            entry["item"] = cache[meta_file.name]["item"]
+        cache[meta_file.name] = entry
+        results[meta_file.name] = (entry["item"], [])
+
+    return [results[meta_file.name] for meta_file in meta_files]
+
+
+# Writes the same bytes as json.dumps(manifest, indent=2), one item at a
+# time, into a temp file that only replaces the manifest once complete. This
+# avoids building the whole document as one string; the item list itself is
+# still held in memory by the caller.
+def write_manifest(path: Path, header: dict, items):
+    tmp = path.with_name(path.name + ".tmp")
+    count = 0
+
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write("{\n")
+            for key, value in header.items():
+                value = json.dumps(value, indent=2).replace("\n", "\n  ")
+                fh.write(f"  {json.dumps(key)}: {value},\n")
+
+            fh.write('  "items": [')
+            for item in items:
+                fh.write(",\n    " if count else "\n    ")
+                fh.write(json.dumps(item, indent=2).replace("\n", "\n    "))
+                count += 1
+            fh.write("\n  ]\n}" if count else "]\n}")
+
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    return count
+
+
+def git(*args):
+    return subprocess.run(
+        ["git", *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+
+
+def is_meta_path(path: str):
+    parent, _, name = path.rpartition("/")
+    return parent == "liveries" and name.endswith(".meta.json")
+
+
+# Items in a committed manifest line up with the sorted meta files of the
+# same commit, so only files git reports as changed since then need reading.
+# Returns None, after printing why, when that base can't be trusted and a full
+# rebuild is needed.
+def ingest_changed(meta_files: list, cache: dict, jobs: int = 1):
+    try:
+        base = git("log", "-1", "--format=%H", "--", MANIFEST_PATH.name).strip()
+        if not base:
+            print("No commit of manifest.json in git history.")
+            return None
+
+        manifest = json_loads(git("show", f"{base}:{MANIFEST_PATH.name}"))
+        manifest = expand_defaults(manifest)
+        listed = git("ls-tree", "--name-only", base, "liveries/").splitlines()
+        diff = git(
+            "diff", "--name-status", "-M", base, "--", "liveries/", "tools/publish.py"
+        ).splitlines()
+        untracked = git(
+            "ls-files", "--others", "--exclude-standard", "--", "liveries/"
+        ).splitlines()
+    except (OSError, subprocess.CalledProcessError, ValueError) as e:
+        print(f"Could not read the base manifest from git ({e}).")
+        return None
+
+    old_names = sorted(Path(p).name for p in listed if is_meta_path(p))
+    items = manifest.get("items") if isinstance(manifest, dict) else None
+    if not isinstance(items, list) or len(items) != len(old_names):
+        print(
+            f"Base manifest at {base[:12]} does not match its "
+            f"{len(old_names)} meta file(s)."
         )
+        return None
 
-    return errors
+    # Keep only meta content, so the result matches a full rebuild whichever
+    # stages produced the base manifest.
+    items = [
+        {k: v for k, v in item.items() if k not in DERIVED_FIELDS} for item in items
+    ]
+    by_name = dict(zip(old_names, items))
+    touched = {Path(p).name for p in untracked if is_meta_path(p)}
 
+    for line in diff:
+        status, *paths = line.split("\t")
+        if "tools/publish.py" in paths:
+            print(f"tools/publish.py changed since {base[:12]}.")
+            return None
+        if status[0] in "DR" and is_meta_path(paths[0]):
+            by_name.pop(Path(paths[0]).name, None)
+        if status[0] != "D" and is_meta_path(paths[-1]):
+            touched.add(Path(paths[-1]).name)
 
-def main():
-    print("JSWORKS publish.py — LEGACY SCHEMA ACTIVE")
+    names = [meta_file.name for meta_file in meta_files]
+    if set(names) != set(by_name) | touched:
+        print(f"Meta files do not line up with git history since {base[:12]}.")
+        return None
+
+    changed = [meta_file for meta_file in meta_files if meta_file.name in touched]
+    print(f"{len(changed)} meta file(s) changed since {base[:12]}.")
+    results = dict(zip((f.name for f in changed), ingest(changed, cache, jobs)))
+
+    return [results.get(name) or (by_name[name], []) for name in names]
+
+
+# Cross-item checks in one pass over a hash index: ids must be unique, and no
+# two liveries may install the same package folder for the same simulator.
+def check_conflicts(named_items: list):
+    errors = []
+    owners = {}
 
+    for fname, item in named_items:
+        claims = {("id", item["id"]): item["id"]}
+        for field in ["package_folders_fs20", "package_folders_fs24"]:
+            for folder in item.get(field, []):
+                # Windows folder names are case-insensitive.
+                claims[(field, folder.casefold())] = folder
+
+        for key, value in claims.items():
+            owner = owners.setdefault(key, fname)
+            if owner == fname:
+                continue
+            if key[0] == "id":
+                errors.append(f"{fname}: duplicate id {value!r} (also in {owner})")
+            else:
+                errors.append(
+                    f"{fname}: {key[0]} entry {value!r} is also claimed by {owner}"
+                )
+
+    return errors
+
+
+def collect(args, cache: dict):
     if not LIVERIES_DIR.exists():
         print("ERROR: liveries/ folder not found")
-        return 1
+        return None
+
+    meta_files = sorted(LIVERIES_DIR.glob("*.meta.json"))
+
+    # Drop entries for deleted files.
+    names = {meta_file.name for meta_file in meta_files}
+    for name in set(cache) - names:
+        del cache[name]
 
     items = []
     failed = False
 
-    for meta_file in sorted(LIVERIES_DIR.glob("*.meta.json")):
-        try:
-            meta = json.loads(meta_file.read_text(encoding="utf-8"))
-        except Exception as e:
-            print(f"{meta_file.name}: invalid JSON ({e})")
-            failed = True
-            continue
-
-        if not isinstance(meta, dict):
-            print(f"{meta_file.name}: root JSON value must be an object")
-            failed = True
-            continue
+    results = None
+    if args.changed:
+        results = ingest_changed(meta_files, cache, args.jobs)
+        if results is None:
+            print("Rebuilding all meta files.")
+    if results is None:
+        results = ingest(meta_files, cache, args.jobs)
 
-        errors = validate_meta(meta, meta_file.name)
+    valid = []
+    for meta_file, (meta, errors) in zip(meta_files, results):
         if errors:
             for err in errors:
                 print(err)
             failed = True
             continue
 
+        valid.append((meta_file.name, meta))
         items.append(meta)
 
+    conflicts = check_conflicts(valid)
+    for err in conflicts:
+        print(err)
+    failed = failed or bool(conflicts)
+
+    if not args.no_cache:
+        save_cache(cache)
+
     if failed:
         print("Publish failed due to validation errors.")
-        return 1
+        return None
+
+    return items
+
+
+def canonical_json(value):
+    canonical = json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return canonical.encode("utf-8")
+
+
+def content_hash(value):
+    return hashlib.sha256(canonical_json(value)).hexdigest()
+
+
+def write_json(path: Path, data):
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+def remove_stale(directory: Path, keep: set):
+    for stale in directory.glob("*.json"):
+        if stale.name not in keep:
+            stale.unlink()
+
+
+def read_json(path: Path):
+    try:
+        manifest = json_loads(path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+    return manifest if isinstance(manifest, dict) else {}
+
+
+# generated_at only moves when the items do, so an unchanged catalog produces
+# an unchanged manifest (and no commit or Pages redeploy).
+def manifest_header(items: list, previous: dict):
+    digest = content_hash(items)
+
+    previous_hash = previous.get("content_hash")
+    if previous_hash is None and isinstance(previous.get("items"), list):
+        previous_hash = content_hash(previous["items"])
+
+    if previous_hash == digest:
+        generated_at = previous.get("generated_at")
+    else:
+        generated_at = datetime.now(timezone.utc).isoformat()
+
+    return {"generated_at": generated_at, "content_hash": digest}
+
+
+# Delta from one catalog version to the next, keyed by item id: new items in
+# full, changed items as the fields to set/unset, and removed ids. "order" is
+# only present when the new order isn't old order minus removed plus added.
+def diff_items(old: list, new: list):
+    old_by_id = {item["id"]: item for item in old}
+    new_ids = [item["id"] for item in new]
+    if len(old_by_id) != len(old) or len(set(new_ids)) != len(new):
+        return None
+
+    kept = set(new_ids)
+    added = []
+    updated = []
+    for item in new:
+        before = old_by_id.get(item["id"])
+        if before is None:
+            added.append(item)
+            continue
+
+        changed = {k: v for k, v in item.items() if k not in before or before[k] != v}
+        unset = [k for k in before if k not in item]
+        if changed or unset:
+            change = {"id": item["id"], "set": changed}
+            if unset:
+                change["unset"] = unset
+            updated.append(change)
+
+    removed = [item_id for item_id in old_by_id if item_id not in kept]
+
+    delta = {"added": added, "updated": updated, "removed": removed}
+    if apply_delta(old, delta) != new:
+        delta["order"] = new_ids
+    return delta
+
+
+# Reference implementation of what a client does with a delta file.
+def apply_delta(items: list, delta: dict):
+    by_id = {item["id"]: dict(item) for item in items}
+
+    for item_id in delta["removed"]:
+        del by_id[item_id]
+    for change in delta["updated"]:
+        item = by_id[change["id"]]
+        item.update(change["set"])
+        for key in change.get("unset", []):
+            del item[key]
+    for item in delta["added"]:
+        by_id[item["id"]] = item
+
+    return [by_id[item_id] for item_id in delta.get("order", by_id)]
+
+
+def write_delta(previous: dict, header: dict, items: list):
+    old_items = previous.get("items")
+    if not isinstance(old_items, list):
+        return
+
+    diff = diff_items(old_items, items)
+    if diff is None:
+        print("Skipping delta: item ids are not unique.")
+        return
+
+    old_hash = previous.get("content_hash") or content_hash(old_items)
+    delta = {"from": old_hash, "to": header["content_hash"], **diff}
+
+    DELTAS_DIR.mkdir(exist_ok=True)
+    name = f"{old_hash[:16]}.json"
+    write_json(DELTAS_DIR / name, delta)
+
+    index_path = DELTAS_DIR / "index.json"
+    entries = [
+        entry
+        for entry in read_json(index_path).get("deltas", [])
+        if entry["from"] != old_hash
+    ]
+    entries.insert(0, {"from": old_hash, "to": delta["to"], "url": f"deltas/{name}"})
+    entries = entries[:DELTA_HISTORY]
+
+    write_json(index_path, {"latest": delta["to"], "deltas": entries})
+
+    keep = {Path(entry["url"]).name for entry in entries} | {index_path.name}
+    remove_stale(DELTAS_DIR, keep)
+
+    print(f"Wrote deltas/{name} ({len(entries)} delta(s) kept).")
+
+
+# Fixed-size pages of the manifest plus a small index, so the app can show the
+# first page immediately and fetch the rest lazily. Pages are cut from the
+# items sorted by id, so each page's first_id..last_id range only contains
+# the ids stored in that page.
+def write_shards(header: dict, items: list, size: int):
+    SHARDS_DIR.mkdir(exist_ok=True)
+    items = sorted(items, key=lambda item: item["id"])
+    shards = []
+
+    for start in range(0, len(items), size):
+        page = items[start : start + size]
+        name = f"{len(shards) + 1:04d}.json"
+        write_json(SHARDS_DIR / name, {"items": page})
+        shards.append(
+            {
+                "url": f"shards/{name}",
+                "count": len(page),
+                "content_hash": content_hash(page),
+                "first_id": page[0]["id"],
+                "last_id": page[-1]["id"],
+            }
+        )
+
+    index = {**header, "shard_size": size, "count": len(items), "shards": shards}
+    write_json(SHARDS_DIR / "index.json", index)
+
+    keep = {Path(shard["url"]).name for shard in shards} | {"index.json"}
+    remove_stale(SHARDS_DIR, keep)
+    print(f"Wrote shards/index.json with {len(shards)} shard(s).")
+
 
-    manifest = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "items": items,
+# Card-level summary for the gallery, with each item's full document in
+# items/<id>.json to be fetched when its card is opened.
+def write_summary(header: dict, items: list):
+    ITEMS_DIR.mkdir(exist_ok=True)
+    cards = []
+    keep = set()
+
+    for item in items:
+        name = quote(item["id"], safe="") + ".json"
+        write_json(ITEMS_DIR / name, item)
+        keep.add(name)
+
+        card = {field: item[field] for field in SUMMARY_FIELDS if field in item}
+        if item.get("photos"):
+            card["thumbnail"] = item["photos"][0]
+        card["detail"] = f"items/{quote(name)}"
+        cards.append(card)
+
+    remove_stale(ITEMS_DIR, keep)
+    write_json(SUMMARY_PATH, {**header, "items": cards})
+    print(f"Wrote summary.json and {len(keep)} item document(s).")
+
+
+# Each item's canonical JSON stored as objects/<sha256>.json, which never
+# changes once written and can be cached as immutable. pointers.json maps ids
+# to those URLs. Objects from the previous pointers.json are kept so clients
+# still holding it can finish fetching.
+def write_objects(header: dict, items: list):
+    OBJECTS_DIR.mkdir(exist_ok=True)
+    previous = read_json(POINTERS_PATH)
+    pointers = []
+
+    for item in items:
+        data = canonical_json(item)
+        name = hashlib.sha256(data).hexdigest() + ".json"
+        path = OBJECTS_DIR / name
+        if not path.exists():
+            path.write_bytes(data)
+        pointers.append({"id": item["id"], "url": f"objects/{name}"})
+
+    if previous.get("content_hash") == header["content_hash"]:
+        print(f"pointers.json is up to date ({len(pointers)} object(s)).")
+        return
+
+    referenced = pointers + previous.get("items", [])
+    remove_stale(OBJECTS_DIR, {Path(pointer["url"]).name for pointer in referenced})
+    write_json(POINTERS_PATH, {**header, "items": pointers})
+    print(f"Wrote pointers.json with {len(pointers)} object(s).")
+
+
+# Minimal CBOR (RFC 8949) codec for the JSON data model, so the manifest can
+# be shipped in a binary form without a third-party dependency.
+def _cbor_head(major: int, value: int):
+    if value < 24:
+        return bytes([major << 5 | value])
+    for info, fmt in ((24, ">B"), (25, ">H"), (26, ">I"), (27, ">Q")):
+        if value < 1 << (8 * struct.calcsize(fmt)):
+            return bytes([major << 5 | info]) + struct.pack(fmt, value)
+    raise ValueError(f"integer too large for CBOR: {value}")
+
+
+def cbor_dumps(value):
+    if value is None:
+        return b"\xf6"
+    if value is True or value is False:
+        return b"\xf5" if value else b"\xf4"
+    if isinstance(value, int):
+        return _cbor_head(0, value) if value >= 0 else _cbor_head(1, -1 - value)
+    if isinstance(value, float):
+        return b"\xfb" + struct.pack(">d", value)
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        return _cbor_head(3, len(data)) + data
+    if isinstance(value, list):
+        return _cbor_head(4, len(value)) + b"".join(map(cbor_dumps, value))
+    if isinstance(value, dict):
+        parts = [cbor_dumps(k) + cbor_dumps(v) for k, v in value.items()]
+        return _cbor_head(5, len(value)) + b"".join(parts)
+    raise TypeError(f"cannot encode {type(value).__name__} as CBOR")
+
+
+# Reference decoder for the subset cbor_dumps() produces.
+def cbor_loads(data: bytes):
+    def read(pos):
+        major, info = data[pos] >> 5, data[pos] & 0x1F
+        pos += 1
+
+        if major == 7:
+            if info == 27:
+                return struct.unpack_from(">d", data, pos)[0], pos + 8
+            return {20: False, 21: True, 22: None}[info], pos
+
+        if info < 24:
+            arg = info
+        else:
+            fmt = {24: ">B", 25: ">H", 26: ">I", 27: ">Q"}[info]
+            arg = struct.unpack_from(fmt, data, pos)[0]
+            pos += struct.calcsize(fmt)
+
+        if major == 0:
+            return arg, pos
+        if major == 1:
+            return -1 - arg, pos
+        if major == 3:
+            return data[pos : pos + arg].decode("utf-8"), pos + arg
+        if major == 4:
+            items = []
+            for _ in range(arg):
+                item, pos = read(pos)
+                items.append(item)
+            return items, pos
+        if major == 5:
+            mapping = {}
+            for _ in range(arg):
+                key, pos = read(pos)
+                mapping[key], pos = read(pos)
+            return mapping, pos
+        raise ValueError(f"unsupported CBOR major type {major}")
+
+    value, end = read(0)
+    if end != len(data):
+        raise ValueError("trailing data after CBOR value")
+    return value
+
+
+def write_cbor(header: dict, items: list):
+    manifest = {**header, "items": items}
+    data = cbor_dumps(manifest)
+    if cbor_loads(data) != manifest:
+        raise ValueError("manifest.cbor does not round-trip")
+
+    CBOR_PATH.write_bytes(data)
+    print(f"Wrote manifest.cbor ({len(data)} bytes).")
+
+
+# Columnar layout: one column per field holding the values of the items that
+# have it ("missing" lists the rows that don't). Repetitive string columns
+# are dictionary-encoded, and URL columns store [origin index, rest] pairs
+# against a shared "origins" table.
+def encode_columns(items: list):
+    fields = list(dict.fromkeys(field for item in items for field in item))
+    origins = {}
+
+    def encode_url(url):
+        origin = URL_ORIGIN.match(url).group(0)
+        return [origins.setdefault(origin, len(origins)), url[len(origin) :]]
+
+    def is_url(value):
+        return isinstance(value, str) and URL_ORIGIN.match(value) is not None
+
+    columns = {}
+    for field in fields:
+        column = {}
+        missing = [row for row, item in enumerate(items) if field not in item]
+        values = [item[field] for item in items if field in item]
+
+        if all(is_url(value) for value in values):
+            column["encoding"] = "url"
+            values = [encode_url(value) for value in values]
+        elif all(
+            isinstance(value, list) and all(map(is_url, value)) for value in values
+        ):
+            column["encoding"] = "url_list"
+            values = [[encode_url(url) for url in value] for value in values]
+        elif all(isinstance(value, str) for value in values):
+            dictionary = list(dict.fromkeys(values))
+            if len(dictionary) * 2 <= len(values):
+                column["encoding"] = "dictionary"
+                column["dictionary"] = dictionary
+                codes = {value: code for code, value in enumerate(dictionary)}
+                values = [codes[value] for value in values]
+
+        column["values"] = values
+        if missing:
+            column["missing"] = missing
+        columns[field] = column
+
+    return {"count": len(items), "origins": list(origins), "columns": columns}
+
+
+# Reference decoder: rebuilds the row form written to manifest.json.
+def decode_columns(doc: dict):
+    origins = doc["origins"]
+    items = [{} for _ in range(doc["count"])]
+
+    for field, column in doc["columns"].items():
+        encoding = column.get("encoding")
+        values = column["values"]
+        if encoding == "url":
+            values = [origins[origin] + rest for origin, rest in values]
+        elif encoding == "url_list":
+            values = [[origins[o] + rest for o, rest in value] for value in values]
+        elif encoding == "dictionary":
+            values = [column["dictionary"][code] for code in values]
+
+        missing = set(column.get("missing", []))
+        rows = (row for row in range(len(items)) if row not in missing)
+        for row, value in zip(rows, values):
+            items[row][field] = value
+
+    return items
+
+
+def write_columns(header: dict, items: list):
+    doc = {**header, **encode_columns(items)}
+    if decode_columns(doc) != items:
+        raise ValueError("manifest.columns.json does not round-trip")
+
+    COLUMNS_PATH.write_text(json.dumps(doc, separators=(",", ":")), encoding="utf-8")
+    print(f"Wrote manifest.columns.json with {len(doc['columns'])} column(s).")
+
+
+def compressed_siblings(path: Path):
+    siblings = {"gzip": path.with_name(path.name + ".gz")}
+    if brotli is not None:
+        siblings["br"] = path.with_name(path.name + ".br")
+    return siblings
+
+
+def fresh_siblings(path: Path):
+    mtime = path.stat().st_mtime
+    return {
+        encoding: sibling
+        for encoding, sibling in compressed_siblings(path).items()
+        if sibling.is_file() and sibling.stat().st_mtime >= mtime
     }
 
-    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
-    print(f"Wrote manifest.json with {len(items)} item(s).")
+
+def compress_file(path: Path):
+    fresh = fresh_siblings(path)
+    if len(fresh) == len(compressed_siblings(path)):
+        return path, {encoding: fresh[encoding].read_bytes() for encoding in fresh}
+
+    encoded = compress(path.read_bytes())
+    for encoding, sibling in compressed_siblings(path).items():
+        sibling.write_bytes(encoded[encoding])
+    return path, encoded
+
+
+# Minified copies of the top-level documents, then .gz (and .br, when the
+# brotli module is installed) siblings of every generated JSON file.
+def write_compressed():
+    documents = [p for p in (MANIFEST_PATH, SUMMARY_PATH, POINTERS_PATH) if p.exists()]
+    for document in list(documents):
+        minified = document.with_suffix(".min.json")
+        data = json_loads(document.read_bytes())
+        minified.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+        documents.append(minified)
+
+    # Already compact.
+    if COLUMNS_PATH.exists():
+        documents.append(COLUMNS_PATH)
+
+    directories = [DELTAS_DIR, SHARDS_DIR, ITEMS_DIR, OBJECTS_DIR]
+    for directory in directories:
+        documents.extend(sorted(directory.glob("*.json")))
+        for sibling in [*directory.glob("*.json.gz"), *directory.glob("*.json.br")]:
+            if not sibling.with_suffix("").exists():
+                sibling.unlink()
+
+    with ThreadPoolExecutor() as pool:
+        results = list(pool.map(compress_file, documents))
+
+    # Size report, one row per top-level file or output directory.
+    report = {}
+    for path, encoded in results:
+        parts = path.relative_to(REPO_ROOT).parts
+        label = parts[0] if len(parts) == 1 else f"{parts[0]}/*.json"
+        row = report.setdefault(label, {"files": 0, "raw": 0})
+        row["files"] += 1
+        row["raw"] += path.stat().st_size
+        for encoding, data in encoded.items():
+            row[encoding] = row.get(encoding, 0) + len(data)
+
+    encodings = compressions()
+    columns = "".join(f"{encoding:>12}" for encoding in encodings)
+    print(f"{'file':<28}{'files':>7}{'raw':>12}{columns}")
+    for label, row in report.items():
+        sizes = "".join(f"{row[encoding]:>12}" for encoding in encodings)
+        print(f"{label:<28}{row['files']:>7}{row['raw']:>12}{sizes}")
+
+
+# Fields every item has and more than half share the same value move into a
+# top-level "defaults" block and are left out of the items that match.
+# "field_order" lists every field in order of first appearance, so elided
+# items expand back with their keys where they were. Items whose keys aren't
+# in that order are written in full.
+def elide_defaults(items: list):
+    defaults = {}
+    for field in items[0] if items else []:
+        if field == "id" or not all(field in item for item in items):
+            continue
+        counts = Counter(canonical_json(item[field]) for item in items)
+        value, count = counts.most_common(1)[0]
+        if count * 2 > len(items):
+            defaults[field] = value
+
+    order = list(dict.fromkeys(field for item in items for field in item))
+    position = {field: index for index, field in enumerate(order)}
+
+    elided = []
+    for item in items:
+        positions = [position[field] for field in item]
+        if positions != sorted(positions):
+            elided.append(item)
+            continue
+        elided.append(
+            {
+                key: value
+                for key, value in item.items()
+                if key not in defaults or canonical_json(value) != defaults[key]
+            }
+        )
+
+    defaults = {field: json_loads(value) for field, value in defaults.items()}
+    return defaults, order, elided
+
+
+# Reference expansion for clients: every item is {**defaults, **item}. Key
+# order only matters for rewriting the manifest byte for byte, so items that
+# lacked a default are laid out by field_order.
+def expand_defaults(manifest):
+    if not isinstance(manifest, dict):
+        return manifest
+
+    defaults = manifest.get("defaults")
+    if not isinstance(defaults, dict) or not isinstance(manifest.get("items"), list):
+        return manifest
+
+    order = manifest.get("field_order") or []
+    expanded = []
+    for item in manifest["items"]:
+        if defaults.keys() <= item.keys():
+            expanded.append(item)
+            continue
+        merged = {**defaults, **item}
+        if set(order) >= merged.keys():
+            merged = {field: merged[field] for field in order if field in merged}
+        expanded.append(merged)
+    manifest["items"] = expanded
+    return manifest
+
+
+def http_request(url: str, method: str = "GET", headers=None):
+    request = urllib.request.Request(
+        url, method=method, headers={"User-Agent": USER_AGENT, **(headers or {})}
+    )
+    return urllib.request.urlopen(request, timeout=LINK_TIMEOUT)
+
+
+def link_result(status: int, headers):
+    result = {"ok": status < 400, "status": status, "checked_at": time.time()}
+    if status >= 400:
+        return result
+
+    # A ranged GET reports the full size after the slash in Content-Range.
+    size = headers.get("Content-Range", "").rpartition("/")[2]
+    size = size or headers.get("Content-Length", "")
+    if size.isdigit():
+        result["size"] = int(size)
+    if headers.get("ETag"):
+        result["etag"] = headers["ETag"]
+    if headers.get("Last-Modified"):
+        result["last_modified"] = headers["Last-Modified"]
+    return result
+
+
+# HEAD first, falling back to a one-byte ranged GET for servers that refuse
+# HEAD. Requests are conditional on a previous healthy result, so a 304 just
+# renews it. Connection errors and 5xx responses are retried with a backoff.
+def probe_link(url: str, cached=None):
+    result = {"ok": False, "status": None}
+
+    conditional = {}
+    if cached and cached.get("ok"):
+        if cached.get("etag"):
+            conditional["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            conditional["If-Modified-Since"] = cached["last_modified"]
+
+    for attempt in range(LINK_RETRIES + 1):
+        if attempt:
+            time.sleep(attempt)
+
+        try:
+            try:
+                with http_request(url, "HEAD", conditional) as response:
+                    return link_result(response.status, response.headers)
+            except urllib.error.HTTPError as e:
+                if e.code not in (403, 405, 501):
+                    raise
+            ranged = {**conditional, "Range": "bytes=0-0"}
+            with http_request(url, headers=ranged) as response:
+                return link_result(response.status, response.headers)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and conditional:
+                return {**cached, "checked_at": time.time()}
+            result = link_result(e.code, e.headers)
+            if e.code < 500:
+                return result
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            result = {"ok": False, "status": None, "error": str(e)}
+
+    result["checked_at"] = time.time()
+    return result
+
+
+# Blocking probes run in the default thread pool; a semaphore per host keeps
+# any one server from seeing more than LINKS_PER_HOST requests at once.
+async def per_host(func, urls: list):
+    limits = {}
+
+    async def run(url):
+        host = urlsplit(url).netloc.lower()
+        async with limits.setdefault(host, asyncio.Semaphore(LINKS_PER_HOST)):
+            return url, await asyncio.to_thread(func, url)
+
+    return dict(await asyncio.gather(*map(run, urls)))
+
+
+# Returns LINK_CACHE_PATH results for urls, re-probing those that are
+# unhealthy or older than LINK_TTL, and the number probed. Results nothing
+# has refreshed for LINK_MAX_AGE are evicted.
+def refresh_links(urls: list):
+    cache = read_json(LINK_CACHE_PATH)
+    now = time.time()
+    stale = [
+        url
+        for url in dict.fromkeys(urls)
+        if not cache.get(url, {}).get("ok")
+        or now - cache[url]["checked_at"] > LINK_TTL
+    ]
+
+    def probe(url):
+        return probe_link(url, cache.get(url))
+
+    if stale:
+        cache.update(asyncio.run(per_host(probe, stale)))
+
+    cache = {
+        url: result
+        for url, result in cache.items()
+        if now - result["checked_at"] <= LINK_MAX_AGE
+    }
+    LINK_CACHE_PATH.write_text(json.dumps(cache), encoding="utf-8")
+    return cache, len(stale)
+
+
+def item_links(item: dict):
+    for field in ["download_fs20", "download_fs24"]:
+        if item.get(field):
+            yield field, item[field]
+    for index, url in enumerate(item.get("photos", [])):
+        yield f"photos[{index}]", url
+
+
+# Only reports broken links; never fails the publish.
+def check_links(items: list):
+    links = {}
+    for item in items:
+        for field, url in item_links(item):
+            links.setdefault(url, []).append(f"{item['id']}.{field}")
+
+    results, probed = refresh_links(list(links))
+
+    unhealthy = [url for url in links if not results[url]["ok"]]
+    for url in unhealthy:
+        reason = results[url].get("status") or results[url].get("error")
+        for ref in links[url]:
+            print(f"Broken link: {ref}: {url} ({reason})")
+
+    print(
+        f"Checked {probed} link(s), reused {len(links) - probed} cached; "
+        f"{len(unhealthy)} unhealthy."
+    )
+
+
+def download_urls(items: list):
+    urls = [
+        item[f"download_{sim}"]
+        for item in items
+        for sim in SIMS
+        if item.get(f"download_{sim}")
+    ]
+    return list(dict.fromkeys(urls))
+
+
+# Sets <key>_fsXX on each item from values[download URL][key]. URLs without a
+# value keep the previous manifest's field as long as the URL is unchanged,
+# so a flaky CDN doesn't churn the manifest.
+def merge_download_fields(items: list, previous_items: list, values: dict, keys):
+    previous = {item.get("id"): item for item in previous_items}
+    fields = {f"{key}_{sim}" for key in keys for sim in SIMS}
+
+    merged = []
+    for item in items:
+        before = previous.get(item["id"], {})
+        item = {k: v for k, v in item.items() if k not in fields}
+
+        for sim in SIMS:
+            url = item.get(f"download_{sim}")
+            if not url:
+                continue
+
+            for key in keys:
+                field = f"{key}_{sim}"
+                if key in values.get(url, {}):
+                    item[field] = values[url][key]
+                elif before.get(f"download_{sim}") == url and field in before:
+                    item[field] = before[field]
+
+        merged.append(item)
+
+    return merged
+
+
+# Adds size_fsXX (bytes) and modified_fsXX (Last-Modified) for each download.
+def enrich_downloads(items: list, previous_items: list):
+    urls = download_urls(items)
+    results, probed = refresh_links(urls)
+
+    values = {}
+    for url in urls:
+        result = results.get(url, {})
+        if not result.get("ok"):
+            continue
+        values[url] = {}
+        if "size" in result:
+            values[url]["size"] = result["size"]
+        if "last_modified" in result:
+            values[url]["modified"] = result["last_modified"]
+
+    print(f"Enriched {len(urls)} download(s), {probed} probed.")
+    return merge_download_fields(items, previous_items, values, ["size", "modified"])
+
+
+# Shared limit on bytes per second across all download threads.
+class Throttle:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.available_at = time.monotonic()
+
+    def wait(self, size: int):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.available_at = max(self.available_at, now) + size / self.rate
+            delay = self.available_at - now
+        time.sleep(delay)
+
+
+def hash_download(url: str, throttle: Throttle):
+    digest = hashlib.sha256()
+    received = 0
+    with http_request(url) as response:
+        expected = response.headers.get("Content-Length", "")
+        while chunk := response.read(HASH_CHUNK):
+            digest.update(chunk)
+            received += len(chunk)
+            throttle.wait(len(chunk))
+
+    # read(n) returns b"" on a dropped connection instead of raising.
+    if expected.isdigit() and received != int(expected):
+        raise OSError(f"connection closed after {received} of {expected} bytes")
+    return digest.hexdigest()
+
+
+async def hash_all(urls: list, throttle: Throttle):
+    limit = asyncio.Semaphore(HASH_CONCURRENCY)
+
+    async def run(url):
+        async with limit:
+            try:
+                return url, await asyncio.to_thread(hash_download, url, throttle)
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                print(f"Could not hash {url} ({e})")
+                return url, None
+
+    return dict(await asyncio.gather(*map(run, urls)))
+
+
+# Adds sha256_fsXX by streaming each download through SHA-256 without saving
+# it. Digests are cached per URL and reused while the link cache reports the
+# same ETag/Last-Modified/size, so archives are only re-read when they change.
+# Unlike size/modified, a digest is never carried over from the previous
+# manifest: if the archive can't be hashed at its current version, the field
+# is dropped rather than left describing an older archive.
+def hash_downloads(items: list, bandwidth: float):
+    urls = download_urls(items)
+    links, _ = refresh_links(urls)
+    cache = read_json(DIGEST_CACHE_PATH)
+
+    versions = {}
+    for url in urls:
+        link = links.get(url, {})
+        if link.get("ok"):
+            versions[url] = [link.get(k) for k in ["etag", "last_modified", "size"]]
+
+    stale = [
+        url
+        for url, version in versions.items()
+        if not any(version) or cache.get(url, {}).get("version") != version
+    ]
+    digests = asyncio.run(hash_all(stale, Throttle(bandwidth))) if stale else {}
+
+    fresh = {}
+    hashed = reused = 0
+    for url, version in versions.items():
+        if url in digests:
+            if digests[url]:
+                fresh[url] = {"version": version, "sha256": digests[url]}
+                hashed += 1
+        elif url in cache:
+            fresh[url] = cache[url]
+            reused += 1
+    DIGEST_CACHE_PATH.write_text(json.dumps(fresh), encoding="utf-8")
+
+    print(
+        f"Hashed {hashed} download(s), reused {reused}, "
+        f"{len(stale) - hashed} failed."
+    )
+    values = {url: {"sha256": entry["sha256"]} for url, entry in fresh.items()}
+    return merge_download_fields(items, [], values, ["sha256"])
+
+
+def fetch_photo(url: str):
+    try:
+        with http_request(url) as response:
+            data = response.read()
+    except (OSError, ValueError, http.client.HTTPException) as e:
+        print(f"Could not fetch {url} ({e})")
+        return None
+
+    digest = hashlib.sha256(data).hexdigest()
+    path = PHOTO_CACHE_DIR / digest
+    if not path.exists():
+        path.write_bytes(data)
+    return digest
+
+
+# Returns url -> content hash for the photos available in PHOTO_CACHE_DIR,
+# downloading only those not fetched before.
+def cache_photos(urls: list):
+    PHOTO_CACHE_DIR.mkdir(exist_ok=True)
+    index_path = PHOTO_CACHE_DIR / "index.json"
+    index = read_json(index_path)
+
+    missing = [
+        url for url in urls if not (PHOTO_CACHE_DIR / index.get(url, "-")).exists()
+    ]
+    if missing:
+        fetched = asyncio.run(per_host(fetch_photo, missing))
+        index.update({url: digest for url, digest in fetched.items() if digest})
+        index_path.write_text(json.dumps(index), encoding="utf-8")
+        print(f"Fetched {len(missing)} photo(s).")
+
+    return {url: index[url] for url in urls if url in index}
+
+
+def photo_formats():
+    Image.init()
+    return [fmt for fmt in ["webp", "avif"] if fmt.upper() in Image.SAVE]
+
+
+# Runs in a worker process. Variant files are named after the source photo's
+# hash, so photos that were already processed are skipped without decoding.
+def make_variants(digest: str):
+    formats = photo_formats()
+    variants = {
+        size: {fmt: f"{THUMBS_DIR.name}/{digest[:16]}-{size}.{fmt}" for fmt in formats}
+        for size in PHOTO_SIZES
+    }
+    paths = [REPO_ROOT / url for urls in variants.values() for url in urls.values()]
+    if all(path.exists() for path in paths):
+        return variants
+
+    try:
+        with Image.open(PHOTO_CACHE_DIR / digest) as source:
+            source.load()
+            mode = "RGBA" if "A" in source.getbands() else "RGB"
+            image = source.convert(mode)
+    except (OSError, ValueError) as e:
+        print(f"Could not decode photo {digest[:16]} ({e})")
+        return None
+
+    for size, urls in variants.items():
+        resized = image.copy()
+        resized.thumbnail((PHOTO_SIZES[size], PHOTO_SIZES[size]))
+        for fmt, url in urls.items():
+            resized.save(REPO_ROOT / url, fmt.upper(), quality=80)
+
+    return variants
+
+
+# Fetches every photo once into PHOTO_CACHE_DIR (content-addressed, with a
+# URL index), renders thumb/medium WebP and AVIF (when Pillow supports it)
+# variants into thumbs/, and lists them per photo in photo_variants.
+def make_thumbnails(items: list, jobs: int):
+    if Image is None:
+        print("Skipping thumbnails: Pillow is not installed.")
+        return items
+
+    THUMBS_DIR.mkdir(exist_ok=True)
+    urls = list(dict.fromkeys(url for item in items for url in item.get("photos", [])))
+    index = cache_photos(urls)
+
+    digests = sorted(set(index.values()))
+    if jobs > 1 and len(digests) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            rendered = dict(zip(digests, pool.map(make_variants, digests)))
+    else:
+        rendered = {digest: make_variants(digest) for digest in digests}
+
+    keep = {
+        Path(url).name
+        for variants in rendered.values()
+        if variants
+        for formats in variants.values()
+        for url in formats.values()
+    }
+    for stale in THUMBS_DIR.iterdir():
+        if stale.name not in keep:
+            stale.unlink()
+
+    print(f"Rendered variants for {len(digests)} photo(s).")
+    return [
+        {
+            **item,
+            "photo_variants": [
+                rendered.get(index.get(url)) for url in item.get("photos", [])
+            ],
+        }
+        for item in items
+    ]
+
+
+def make_placeholder(digest: str):
+    try:
+        with Image.open(PHOTO_CACHE_DIR / digest) as source:
+            source.load()
+            image = source.convert("RGB")
+    except (OSError, ValueError) as e:
+        print(f"Could not decode photo {digest[:16]} ({e})")
+        return None
+
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    fmt = "webp" if "webp" in photo_formats() else "jpeg"
+    buffer = io.BytesIO()
+    image.save(buffer, fmt.upper(), quality=30)
+    data = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return f"data:image/{fmt};base64,{data}"
+
+
+# Embeds a tiny base64 image of each item's first photo as "placeholder",
+# so the gallery can paint something before the real thumbnail arrives.
+# Placeholders are cached by the photo's content hash.
+def make_placeholders(items: list):
+    if Image is None:
+        print("Skipping placeholders: Pillow is not installed.")
+        return items
+
+    firsts = dict.fromkeys(item["photos"][0] for item in items if item.get("photos"))
+    index = cache_photos(list(firsts))
+    cache = read_json(PLACEHOLDERS_PATH)
+
+    made = 0
+    for digest in set(index.values()) - set(cache):
+        placeholder = make_placeholder(digest)
+        if placeholder:
+            cache[digest] = placeholder
+            made += 1
+    PLACEHOLDERS_PATH.write_text(json.dumps(cache), encoding="utf-8")
+
+    print(f"Made {made} placeholder(s).")
+    placeheld = []
+    for item in items:
+        item = {k: v for k, v in item.items() if k != "placeholder"}
+        digest = index.get(item["photos"][0]) if item.get("photos") else None
+        if digest in cache:
+            item["placeholder"] = cache[digest]
+        placeheld.append(item)
+    return placeheld
+
+
+# Packs a cover-cropped cell of the first photo of the first `count` items in
+# gallery order (featured first) into one image, with atlas.json mapping each
+# id to its [x, y, width, height]. The key in atlas.json covers the ids, their
+# order and their photos, so an unchanged first screen is not redrawn.
+def write_atlas(items: list, count: int):
+    if Image is None:
+        print("Skipping atlas: Pillow is not installed.")
+        return
+
+    ordered = sorted(items, key=lambda item: not item.get("featured"))
+    shown = [item for item in ordered if item.get("photos")][:count]
+    index = cache_photos([item["photos"][0] for item in shown])
+    cells = [
+        (item["id"], index[item["photos"][0]])
+        for item in shown
+        if item["photos"][0] in index
+    ]
+
+    fmt = "webp" if "webp" in photo_formats() else "jpeg"
+    key = content_hash([fmt, ATLAS_CELL, ATLAS_COLUMNS, cells])
+    previous = read_json(ATLAS_MAP_PATH)
+    drawn = not cells or (REPO_ROOT / previous.get("image", "-")).exists()
+    if previous.get("key") == key and drawn:
+        print(f"atlas.json is up to date ({len(cells)} cell(s)).")
+        return
+
+    width, height = ATLAS_CELL
+    rows = -(-len(cells) // ATLAS_COLUMNS)
+    atlas = Image.new("RGB", (width * min(len(cells), ATLAS_COLUMNS), height * rows))
+    rects = {}
+    for position, (item_id, digest) in enumerate(cells):
+        try:
+            with Image.open(PHOTO_CACHE_DIR / digest) as source:
+                source.load()
+                cell = ImageOps.fit(source.convert("RGB"), ATLAS_CELL)
+        except (OSError, ValueError) as e:
+            print(f"Could not decode photo {digest[:16]} ({e})")
+            continue
+        x, y = position % ATLAS_COLUMNS * width, position // ATLAS_COLUMNS * height
+        atlas.paste(cell, (x, y))
+        rects[item_id] = [x, y, width, height]
+
+    image = f"atlas.{fmt}"
+    keep = {ATLAS_MAP_PATH.name, image} if cells else {ATLAS_MAP_PATH.name}
+    for stale in REPO_ROOT.glob("atlas.*"):
+        if stale.name not in keep:
+            stale.unlink()
+    if cells:
+        atlas.save(REPO_ROOT / image, fmt.upper(), quality=80)
+    write_json(ATLAS_MAP_PATH, {"key": key, "image": image, "cells": rects})
+    print(f"Wrote {image} with {len(rects)} cell(s).")
+
+
+# Read-only seekable view of a remote file over HTTP Range requests. The
+# first request fetches the tail (end-of-central-directory record, and often
+# the whole central directory), so zipfile can list a multi-GB archive while
+# only a few kilobytes are transferred.
+class RemoteFile(io.RawIOBase):
+    def __init__(self, url: str):
+        self.url = url
+        self.pos = 0
+        with http_request(url, headers={"Range": f"bytes=-{ZIP_TAIL}"}) as response:
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if response.status != 206 or not total.isdigit():
+                raise OSError(f"{url}: server does not support Range requests")
+            self.tail = response.read()
+        self.size = int(total)
+        self.tail_start = self.size - len(self.tail)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: self.size}
+        self.pos = max(base[whence] + offset, 0)
+        return self.pos
+
+    def readinto(self, buffer):
+        end = min(self.pos + len(buffer), self.size)
+        if end <= self.pos:
+            return 0
+
+        if self.pos >= self.tail_start:
+            data = self.tail[self.pos - self.tail_start : end - self.tail_start]
+        else:
+            byte_range = {"Range": f"bytes={self.pos}-{end - 1}"}
+            with http_request(self.url, headers=byte_range) as response:
+                if response.status != 206:
+                    raise OSError(f"{self.url}: server ignored Range request")
+                data = response.read()
+
+        buffer[: len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+
+def zip_top_folders(url: str):
+    with zipfile.ZipFile(RemoteFile(url)) as archive:
+        names = [name.replace("\\", "/") for name in archive.namelist()]
+    return sorted({name.split("/")[0] for name in names if "/" in name})
+
+
+# Compares each archive's top-level folders with package_folders_fsXX. The
+# listing is cached per URL and reused while its ETag/Last-Modified (from
+# the link cache) is unchanged. Only reports; never fails the publish.
+def verify_packages(items: list):
+    packages = [
+        (item["id"], sim, item[f"download_{sim}"], item.get(f"package_folders_{sim}"))
+        for item in items
+        for sim in SIMS
+        if item.get(f"download_{sim}")
+    ]
+    links, _ = refresh_links([url for _, _, url, _ in packages])
+    cache = read_json(ZIP_CACHE_PATH)
+    fresh = {}
+    read = problems = 0
+
+    for item_id, sim, url, declared in packages:
+        link = links.get(url, {})
+        if not link.get("ok"):
+            reason = link.get("status") or link.get("error")
+            print(f"Package check: {item_id} {sim}: {url} unreachable ({reason})")
+            problems += 1
+            continue
+
+        version = [link.get("etag"), link.get("last_modified")]
+        entry = cache.get(url)
+
+        if not entry or entry["version"] != version or not any(version):
+            try:
+                entry = {"version": version, "folders": zip_top_folders(url)}
+            except (
+                OSError,
+                ValueError,
+                zipfile.BadZipFile,
+                http.client.HTTPException,
+            ) as e:
+                print(f"Package check: {item_id} {sim}: could not read {url} ({e})")
+                problems += 1
+                continue
+            read += 1
+        fresh[url] = entry
+
+        # Case-insensitive, as in check_conflicts.
+        archive = {folder.casefold(): folder for folder in entry["folders"]}
+        listed = {folder.casefold(): folder for folder in declared or []}
+        for key in sorted(listed.keys() - archive.keys()):
+            print(f"Package check: {item_id} {sim}: {listed[key]!r} not in archive")
+            problems += 1
+        for key in sorted(archive.keys() - listed.keys()):
+            print(f"Package check: {item_id} {sim}: {archive[key]!r} not declared")
+            problems += 1
+
+    ZIP_CACHE_PATH.write_text(json.dumps(fresh), encoding="utf-8")
+    print(
+        f"Verified {len(packages)} package(s), {read} archive(s) read; "
+        f"{problems} problem(s)."
+    )
+
+
+# Runs the opt-in stages that add derived fields to the validated items.
+def derive_items(args, items: list, previous_items: list):
+    if args.enrich_downloads:
+        items = enrich_downloads(items, previous_items)
+
+    if args.thumbnails:
+        items = make_thumbnails(items, args.jobs)
+
+    if args.placeholders:
+        items = make_placeholders(items)
+
+    if args.hash_downloads:
+        bandwidth = args.bandwidth * 1024 * 1024
+        items = hash_downloads(items, bandwidth)
+
+    return items
+
+
+# The header and items as they are laid out in manifest.json.
+def manifest_document(args, header: dict, items: list):
+    if args.elide_defaults:
+        defaults, order, elided = elide_defaults(items)
+        return {**header, "defaults": defaults, "field_order": order}, elided
+    return header, items
+
+
+def publish(args, cache: dict):
+    items = collect(args, cache)
+    if items is None:
+        return 1
+
+    previous = expand_defaults(read_json(MANIFEST_PATH))
+    items = derive_items(args, items, previous.get("items", []))
+
+    header = manifest_header(items, previous)
+    if (
+        previous.get("content_hash") == header["content_hash"]
+        and ("defaults" in previous) == args.elide_defaults
+    ):
+        print(f"manifest.json is up to date ({len(items)} item(s)).")
+    else:
+        count = write_manifest(MANIFEST_PATH, *manifest_document(args, header, items))
+        print(f"Wrote manifest.json with {count} item(s).")
+
+        if args.deltas:
+            write_delta(previous, header, items)
+
+    if args.shards:
+        write_shards(header, items, args.shards)
+
+    if args.summary:
+        write_summary(header, items)
+
+    if args.atlas:
+        write_atlas(items, args.atlas)
+
+    if args.objects:
+        write_objects(header, items)
+
+    if args.cbor:
+        write_cbor(header, items)
+
+    if args.columns:
+        write_columns(header, items)
+
+    if args.compress:
+        write_compressed()
+
+    if args.check_links:
+        check_links(items)
+
+    if args.verify_packages:
+        verify_packages(items)
 
     return 0
 
 
+def snapshot():
+    try:
+        entries = list(os.scandir(LIVERIES_DIR))
+    except FileNotFoundError:
+        return {}
+
+    state = {}
+    for entry in entries:
+        if not entry.name.endswith(".meta.json"):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            # Deleted mid-scan or a dangling link; publish reports it.
+            stat = None
+        state[entry.name] = (stat.st_size, stat.st_mtime_ns) if stat else None
+    return state
+
+
+# With inotify, a burst of events is over once WATCH_QUIET_MS pass without
+# another; events that leave the meta files as they were are ignored.
+def inotify_changes():
+    inotify = INotify()
+    mask = (
+        flags.CREATE
+        | flags.CLOSE_WRITE
+        | flags.ATTRIB
+        | flags.MOVED_FROM
+        | flags.MOVED_TO
+        | flags.DELETE
+    )
+    inotify.add_watch(LIVERIES_DIR, mask)
+    seen = snapshot()
+
+    while True:
+        inotify.read()
+        while inotify.read(timeout=WATCH_QUIET_MS):
+            pass
+
+        current = snapshot()
+        if current != seen:
+            seen = current
+            yield
+
+
+# Yields once per burst of saves in liveries/, after it has settled. Uses
+# inotify when inotify_simple is installed, otherwise polls every `interval`
+# seconds.
+def changes(interval: float):
+    if INotify is not None and LIVERIES_DIR.is_dir():
+        yield from inotify_changes()
+        return
+
+    seen = snapshot()
+
+    while True:
+        time.sleep(interval)
+        current = snapshot()
+        if current == seen:
+            continue
+
+        while True:
+            time.sleep(WATCH_DEBOUNCE)
+            settled = snapshot()
+            if settled == current:
+                break
+            current = settled
+
+        seen = current
+        yield
+
+
+# The in-memory cache means each rebuild only re-reads the files that changed.
+def watch(args, cache: dict):
+    print(f"Watching {LIVERIES_DIR} for changes (Ctrl+C to stop).")
+    publish(args, cache)
+
+    try:
+        for _ in changes(args.interval):
+            publish(args, cache)
+    except KeyboardInterrupt:
+        return 0
+
+
+def accepted_encodings(header: str):
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:] or 0) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header: str, size: int):
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        length = int(last)
+        return (max(size - length, 0), size - 1) if length else ()
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    return (start, end) if start <= end else ()
+
+
+def compressions():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_as(data: bytes, encoding: str):
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, 9, mtime=0)
+
+
+def compress(data: bytes):
+    return {encoding: compress_as(data, encoding) for encoding in compressions()}
+
+
+# Compressed bodies are made on first use, only for encodings that a client
+# actually negotiated.
+class Document:
+    def __init__(self, body: bytes, content_type: str, encoded=None):
+        self.content_type = content_type
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.encodings = list(encoded) if encoded else compressions()
+        self.bodies = {**(encoded or {}), "identity": body}
+        self.lock = threading.Lock()
+
+    def body(self, encoding: str):
+        with self.lock:
+            if encoding not in self.bodies:
+                self.bodies[encoding] = compress_as(self.bodies["identity"], encoding)
+            return self.bodies[encoding]
+
+
+class ManifestRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so a polling client reuses its connection; without Nagle,
+    # small bodies aren't held back behind the headers.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_HEAD(self):
+        self.send_document(head=True)
+
+    def do_GET(self):
+        self.send_document(head=False)
+
+    def send_document(self, head: bool):
+        doc = self.server.document(urlsplit(self.path).path)
+        if doc is None:
+            self.send_error(404)
+            return
+
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        encoding = next((e for e in doc.encodings if e in accepted), "identity")
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        etag = f'"{doc.etag}{suffix}"'
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag in tags:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        body = doc.body(encoding)
+        status = 200
+        byte_range = None
+        if "Range" in self.headers:
+            try:
+                byte_range = parse_range(self.headers["Range"], len(body))
+            except ValueError:
+                byte_range = None
+
+        if byte_range == ():
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(body)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if byte_range:
+            status = 206
+            start, end = byte_range
+            content_range = f"bytes {start}-{end}/{len(body)}"
+            body = body[start : end + 1]
+
+        self.send_response(status)
+        self.send_header("Content-Type", doc.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Cache-Control", "no-cache")
+        if encoding != "identity":
+            self.send_header("Content-Encoding", encoding)
+        if status == 206:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+        if not head:
+            self.wfile.write(body)
+
+
+# Serves manifest.json built in memory from liveries/, and any other file in
+# the repo (derived outputs) from disk.
+class ManifestServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, args, cache: dict):
+        super().__init__(address, ManifestRequestHandler)
+        self.args = args
+        self.cache = cache
+        self.manifest = None
+        self.header = {}
+        self.files = {}
+        self.rebuild()
+
+    # Same document publish() would write, kept in memory.
+    def rebuild(self):
+        items = collect(self.args, self.cache)
+        if items is None:
+            return
+
+        written = expand_defaults(read_json(MANIFEST_PATH))
+        items = derive_items(self.args, items, written.get("items", []))
+        previous = self.header if self.manifest else written
+        self.header = manifest_header(items, previous)
+
+        header, items = manifest_document(self.args, self.header, items)
+        body = json.dumps({**header, "items": items}, indent=2).encode("utf-8")
+        self.manifest = Document(body, "application/json")
+        print(f"Serving manifest.json with {len(items)} item(s).")
+
+    def document(self, path: str):
+        if path == "/" + MANIFEST_PATH.name:
+            return self.manifest
+
+        target = (REPO_ROOT / unquote(path).lstrip("/")).resolve()
+        if not target.is_relative_to(REPO_ROOT) or not target.is_file():
+            return None
+        if any(part.startswith(".") for part in target.relative_to(REPO_ROOT).parts):
+            return None
+
+        # Prefer precompressed siblings written by --compress when fresh.
+        siblings = fresh_siblings(target)
+        stat = target.stat()
+        key = (
+            stat.st_mtime_ns,
+            stat.st_size,
+            sorted((e, sibling.stat().st_mtime_ns) for e, sibling in siblings.items()),
+        )
+        cached = self.files.get(target)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        encoded = {encoding: path.read_bytes() for encoding, path in siblings.items()}
+        content_type = mimetypes.guess_type(target.name)[0]
+        doc = Document(
+            target.read_bytes(),
+            content_type or "application/octet-stream",
+            encoded or None,
+        )
+        self.files[target] = (key, doc)
+        return doc
+
+    def rebuild_on_changes(self):
+        for _ in changes(self.args.interval):
+            self.rebuild()
+
+
+def serve(args, cache: dict):
+    server = ManifestServer((args.host, args.port), args, cache)
+    threading.Thread(target=server.rebuild_on_changes, daemon=True).start()
+
+    print(f"Serving on http://{args.host}:{server.server_port}/ (Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate manifest.json")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"re-parse every meta file instead of reusing {CACHE_PATH.name}",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="parse and validate meta files in this many worker processes "
+        "(0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--changed",
+        action="store_true",
+        help="only read meta files git reports as changed since the commit "
+        "that last updated manifest.json",
+    )
+    parser.add_argument(
+        "--deltas",
+        action="store_true",
+        help="also write a delta from the previous manifest into deltas/",
+    )
+    parser.add_argument(
+        "--elide-defaults",
+        action="store_true",
+        help="write common field values once in a top-level defaults block "
+        "instead of in every item",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        metavar="SIZE",
+        help="also write the items as pages of SIZE into shards/ with an index",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="also write summary.json (gallery cards) and items/<id>.json",
+    )
+    parser.add_argument(
+        "--objects",
+        action="store_true",
+        help="also write content-addressed objects/<sha256>.json and "
+        "pointers.json",
+    )
+    parser.add_argument(
+        "--cbor",
+        action="store_true",
+        help="also write the manifest as CBOR to manifest.cbor",
+    )
+    parser.add_argument(
+        "--columns",
+        action="store_true",
+        help="also write a columnar, dictionary-encoded manifest.columns.json",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="also write minified copies and precompressed .gz/.br siblings "
+        "of the generated JSON, with a size report",
+    )
+    parser.add_argument(
+        "--enrich-downloads",
+        action="store_true",
+        help="add size_fs20/fs24 and modified_fs20/fs24 from download URL "
+        "headers",
+    )
+    parser.add_argument(
+        "--hash-downloads",
+        action="store_true",
+        help="add sha256_fs20/fs24 by streaming each download through SHA-256",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        default=0,
+        metavar="MIB_S",
+        help="total download rate cap for --hash-downloads (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--thumbnails",
+        action="store_true",
+        help="render thumb/medium WebP/AVIF variants of every photo into "
+        "thumbs/ (needs Pillow)",
+    )
+    parser.add_argument(
+        "--placeholders",
+        action="store_true",
+        help="embed a tiny base64 placeholder of each item's first photo "
+        "(needs Pillow)",
+    )
+    parser.add_argument(
+        "--atlas",
+        type=int,
+        default=0,
+        metavar="N",
+        help="pack the first N gallery photos (featured first) into one sprite "
+        "image with atlas.json coordinates (needs Pillow)",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="probe download and photo URLs and report broken ones "
+        f"(results cached in {LINK_CACHE_PATH.name})",
+    )
+    parser.add_argument(
+        "--verify-packages",
+        action="store_true",
+        help="compare each download archive's top-level folders with "
+        "package_folders_fs20/fs24 using HTTP Range reads",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and republish whenever liveries/ changes",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="seconds between checks for changes in --watch/--serve mode "
+        "when inotify_simple is not installed",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve manifest.json over HTTP, rebuilt in memory on changes",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="--serve address")
+    parser.add_argument("--port", type=int, default=8000, help="--serve port")
+    args = parser.parse_args(argv)
+    if args.shards is not None and args.shards < 1:
+        parser.error("--shards must be at least 1")
+    args.jobs = args.jobs or os.cpu_count() or 1
+
+    print("JSWORKS publish.py — LEGACY SCHEMA ACTIVE")
+
+    cache = {} if args.no_cache else load_cache()
+
+    if args.serve:
+        return serve(args, cache)
+
+    if args.watch:
+        return watch(args, cache)
+
+    return publish(args, cache)
+
+
 if __name__ == "__main__":
     sys.exit(main())